@@ -1,20 +1,21 @@
 # app.py
 
 import streamlit as st
-from db_utils import init_db, verify_user
+from db_utils import bootstrap_db, verify_user
 from setup import check_and_install_playwright # Import the new function
 
+# Must be the first Streamlit call, and is made exactly once per run
+st.set_page_config(page_title="Evaluation Report Builder", page_icon="🏠", layout="wide")
+
 # --- First-time setup for Streamlit Cloud ---
 # This will check and install Playwright's browser if needed.
-# It uses session_state to run only once.
+# The check runs once per process; later reruns and sessions reuse the result.
 is_ready = check_and_install_playwright()
 
 # --- The rest of your app will only run if the setup is complete ---
 if is_ready:
-    # Initialize the database
-    init_db()
-
-    st.set_page_config(page_title="Evaluation Report Builder", page_icon="🔐", layout="centered")
+    # Initialize the database (runs once per process, cached afterwards)
+    bootstrap_db()
 
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
@@ -36,7 +37,6 @@ if is_ready:
                 else:
                     st.error("Invalid username or password")
     else:
-        st.set_page_config(page_title="Evaluation Report Builder", page_icon="🏠", layout="wide")
         st.title("Welcome to the Evaluation Report Builder")
         
         st.markdown(
@@ -56,5 +56,5 @@ if is_ready:
         
         with st.sidebar:
             if st.button("Logout"):
-                for key in list(st.session_state.keys()): del st.session_state[key]
+                for key in ('authenticated', 'username', 'role', 'processed_data'): st.session_state.pop(key, None)
                 st.rerun()
\ No newline at end of file
@@ -2,14 +2,63 @@
 
 import sqlite3
 import hashlib
+import hmac
+import threading
+import streamlit as st
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+# One hasher for the whole process so the argon2 cost parameters are built once.
+PASSWORD_HASHER = PasswordHasher()
+# Verified against when a username is unknown, so a miss costs the same argon2 work as a wrong password
+# and response timing doesn't reveal which usernames exist.
+DUMMY_PASSWORD_HASH = PASSWORD_HASHER.hash("not-a-real-password")
+
+# Kept as module constants so every call sends byte-identical SQL and hits the
+# connection's prepared-statement cache instead of re-preparing.
+INSERT_USER_SQL = "INSERT INTO users (username, password, role) VALUES (?, ?, ?)"
+SELECT_USER_TABLE_SQL = "SELECT username, password, role FROM users"
+SELECT_ALL_USERS_SQL = "SELECT username, role FROM users"
+INSERT_USER_IF_NEW_SQL = "INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)"
+UPDATE_PASSWORD_SQL = "UPDATE users SET password = ? WHERE username = ?"
+
+# Every session thread shares the one cached connection, so write transactions must take turns:
+# a second BEGIN on the same connection would fail, and its `with conn:` could end another thread's transaction.
+_write_lock = threading.Lock()
 
 def hash_password(password):
-    """Hashes the password using SHA-256."""
+    """Hashes the password with argon2id. The returned string embeds its own salt and parameters."""
+    return PASSWORD_HASHER.hash(password)
+
+def _legacy_sha256(password):
+    """Unsalted SHA-256 hex digest used by accounts created before the switch to argon2."""
     return hashlib.sha256(password.encode()).hexdigest()
 
+def check_password(stored_hash, password):
+    """Checks a password against a stored argon2 or legacy SHA-256 hash in constant time."""
+    if stored_hash.startswith('$argon2'):
+        try:
+            return PASSWORD_HASHER.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return hmac.compare_digest(stored_hash, _legacy_sha256(password))
+
+@st.cache_resource
+def get_conn():
+    """Returns the shared database connection, opened once per process and reused across reruns."""
+    # Autocommit mode: writes open their own BEGIN IMMEDIATE, bypassing pysqlite's implicit transactions
+    conn = sqlite3.connect('users.db', check_same_thread=False, isolation_level=None)
+    # WAL lets logins read while another session writes; NORMAL sync is safe under WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-8000")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
 def init_db():
     """Initializes the database and creates the users table if it doesn't exist."""
-    conn = sqlite3.connect('users.db')
+    conn = get_conn()
     c = conn.cursor()
     # Create table with username, hashed_password, and role
     c.execute('''
@@ -19,50 +68,79 @@ def init_db():
             role TEXT NOT NULL
         )
     ''')
-    # Check if the default admin user exists
-    c.execute("SELECT * FROM users WHERE username = ?", ('admin',))
-    if c.fetchone() is None:
-        # If not, create a default admin user with password 'admin'
-        hashed_admin_password = hash_password('admin')
-        c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                  ('admin', hashed_admin_password, 'admin'))
-    conn.commit()
-    conn.close()
+    with _write_lock, conn:
+        c.execute("BEGIN IMMEDIATE")
+        # Check if the default admin user exists
+        c.execute("SELECT * FROM users WHERE username = ?", ('admin',))
+        if c.fetchone() is None:
+            # If not, create a default admin user with password 'admin'
+            hashed_admin_password = hash_password('admin')
+            c.execute(INSERT_USER_SQL, ('admin', hashed_admin_password, 'admin'))
+
+@st.cache_resource
+def bootstrap_db():
+    """Runs init_db only on cold start; later reruns hit the cache and skip the schema checks."""
+    init_db()
+    return True
 
 def add_user(username, password, role):
     """Adds a new user to the database. Returns True on success, False otherwise."""
+    conn = get_conn()
+    hashed_password = hash_password(password)
     try:
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        hashed_password = hash_password(password)
-        c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                  (username, hashed_password, role))
-        conn.commit()
-        conn.close()
+        with _write_lock, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(INSERT_USER_SQL, (username, hashed_password, role))
+        get_all_users.clear()
+        _user_table.clear()
         return True
     except sqlite3.IntegrityError:
-        # This error occurs if the username already exists
+        # This error occurs if the username already exists (`with conn` has already rolled back)
         return False
 
+def add_users_bulk(rows):
+    """
+    Adds many (username, password, role) rows in a single transaction with one prepared INSERT.
+    Existing usernames are skipped. Returns the number of users actually created.
+    """
+    conn = get_conn()
+    hashed_rows = [(username, hash_password(password), role) for username, password, role in rows]
+    with _write_lock:
+        before = conn.total_changes
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(INSERT_USER_IF_NEW_SQL, hashed_rows)
+        created = conn.total_changes - before
+    if created:
+        get_all_users.clear()
+        _user_table.clear()
+    return created
+
+@st.cache_resource
+def _user_table():
+    """In-memory {username: (password_hash, role)} map so logins are a dict lookup, not a query."""
+    return {username: (password, role) for username, password, role in get_conn().execute(SELECT_USER_TABLE_SQL)}
+
 def verify_user(username, password):
     """Verifies user credentials. Returns user's role if valid, None otherwise."""
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT password, role FROM users WHERE username = ?", (username,))
-    result = c.fetchone()
-    conn.close()
+    result = _user_table().get(username)
     if result:
         stored_password_hash, role = result
-        entered_password_hash = hash_password(password)
-        if stored_password_hash == entered_password_hash:
+        if check_password(stored_password_hash, password):
+            # Upgrade legacy SHA-256 hashes (and outdated argon2 parameters) on successful login
+            if not stored_password_hash.startswith('$argon2') or PASSWORD_HASHER.check_needs_rehash(stored_password_hash):
+                conn = get_conn()
+                new_hash = hash_password(password)
+                with _write_lock, conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(UPDATE_PASSWORD_SQL, (new_hash, username))
+                _user_table.clear()
             return role  # Return the user's role on successful login
+    else:
+        check_password(DUMMY_PASSWORD_HASH, password)
     return None
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_all_users():
-    """Retrieves all users and their roles from the database."""
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT username, role FROM users")
-    users = c.fetchall()
-    conn.close()
-    return users
\ No newline at end of file
+    """Retrieves all users and their roles from the database. Cached briefly; add_user invalidates it."""
+    return get_conn().execute(SELECT_ALL_USERS_SQL).fetchall()
\ No newline at end of file
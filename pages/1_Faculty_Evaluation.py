@@ -2,26 +2,26 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import sys
-import platform
-import asyncio
 
 # --- SECURITY GATE & FIXES: Ensures user is logged in and all modules can be imported ---
 if not st.session_state.get('authenticated', False):
     st.error("Please log in to access this page.")
     st.stop()
-if platform.system() == 'Windows':
-    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-if project_root not in sys.path:
-    sys.path.append(project_root)
+# Page scripts re-run with fresh globals, so key the path fix on sys.modules: once utils
+# has been imported in this process, the filesystem probe is skipped on every rerun.
+if 'utils' not in sys.modules:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
 
 try:
     from utils import (
-        display_metadata_form, create_pie_chart, calculate_scores,
-        generate_report_html, convert_html_to_pdf
+        Scale, display_metadata_form, create_pie_grid, calculate_scores,
+        generate_report_html, render_pdf_in_background, filter_comments
     )
 except ImportError as e:
     st.error(f"A critical error occurred trying to import from 'utils.py': {e}")
@@ -29,21 +29,12 @@ except ImportError as e:
 
 # --- Page-Specific Configurations ---
 PAGE_TITLE = "Faculty Evaluation"
-SCORE_MAPPING = {
-    'A: Excellent': 5,
-    'B: Very Good': 4,
-    'C: Good': 3,
-    'D: Satisfactory': 2,
-    'E: Not Satisfactory': 1
-}
-CATEGORY_ORDER = ["Excellent", "Very Good", "Good", "Satisfactory", "Not Satisfactory"]
-COLOR_MAP = {
-    "Excellent": "#2ca02c",
-    "Very Good": "#1f77b4",
-    "Good": "#ff7f0e",
-    "Satisfactory": "#d62728",
-    "Not Satisfactory": "#9467bd"
-}
+# Answers may carry an option prefix ("A: Excellent"); the scale matches on the label after it
+RATING_SCALE = Scale(
+    order=("Excellent", "Very Good", "Good", "Satisfactory", "Not Satisfactory"),
+    colors=np.array(["#2ca02c", "#1f77b4", "#ff7f0e", "#d62728", "#9467bd"]),
+    codes=np.array([5, 4, 3, 2, 1], dtype=np.int8)
+)
 COMMENT_COLUMN = 'General comments'
 QUESTION_COLUMNS_SLICE = slice(1, 9)
 CONVERTED_SCORE_MAX = 60
@@ -52,7 +43,7 @@ def display_score_analysis(df):
     """Displays the score analysis UI for this page."""
     st.subheader("Score Summary")
     scores_df, total_avg_sum, converted_score, overall_average, max_possible_sum = calculate_scores(
-        df, QUESTION_COLUMNS_SLICE, SCORE_MAPPING, CONVERTED_SCORE_MAX
+        df, QUESTION_COLUMNS_SLICE, RATING_SCALE, CONVERTED_SCORE_MAX
     )
     st.write("The table below shows the average score for each attribute on a scale of 1 to 5.")
     st.dataframe(scores_df.style.format({"Average Score": "{:.2f}"}), use_container_width=True)
@@ -73,14 +64,14 @@ st.title(f"🧑‍🏫 {PAGE_TITLE} Report Builder")
 with st.sidebar:
     st.write(f"Logged in as **{st.session_state.username}**")
     if st.button("Logout", key="logout_faculty"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        for key in ('authenticated', 'username', 'role', 'processed_data'):
+            st.session_state.pop(key, None)
         st.rerun()
     st.markdown("---")
 
     # Show the form if no report has been generated yet
     if 'processed_data' not in st.session_state:
-        display_metadata_form(PAGE_TITLE, requires_faculty_name=True)
+        display_metadata_form(PAGE_TITLE, requires_faculty_name=True, question_columns_slice=QUESTION_COLUMNS_SLICE)
     # Once a report is generated, show the export and clear options
     else:
         st.header("Export Report")
@@ -89,11 +80,11 @@ with st.sidebar:
         
         if st.button("Generate PDF", key="generate_faculty_pdf"):
             with st.spinner("Generating PDF... This may take a moment."):
-                html_string = generate_report_html(
-                    data['df'], PAGE_TITLE, metadata, QUESTION_COLUMNS_SLICE, CATEGORY_ORDER, 
-                    COLOR_MAP, COMMENT_COLUMN, SCORE_MAPPING, CONVERTED_SCORE_MAX
+                html_string, assets = generate_report_html(
+                    data['df'], PAGE_TITLE, metadata, QUESTION_COLUMNS_SLICE, RATING_SCALE,
+                    COMMENT_COLUMN, CONVERTED_SCORE_MAX
                 )
-                pdf_bytes = convert_html_to_pdf(html_string)
+                pdf_bytes = render_pdf_in_background(html_string, assets)
                 
                 # Sanitize each part of the metadata for a clean filename
                 fn = metadata.get('Faculty Name', 'Faculty').replace(' ', '_')
@@ -129,23 +120,13 @@ if 'processed_data' in st.session_state:
         st.markdown("---")
         
         st.subheader("Quantitative Feedback Analysis")
-        for i in range(0, len(question_columns), 2):
-            col1, col2 = st.columns(2)
-            with col1:
-                fig1 = create_pie_chart(df, question_columns[i], CATEGORY_ORDER, COLOR_MAP)
-                # FIX: Use a simple and robust key based on the loop index
-                st.plotly_chart(fig1, use_container_width=True, key=f"faculty_chart_{i}")
-            if (i + 1) < len(question_columns):
-                with col2:
-                    fig2 = create_pie_chart(df, question_columns[i+1], CATEGORY_ORDER, COLOR_MAP)
-                    # FIX: Use a simple and robust key based on the loop index
-                    st.plotly_chart(fig2, use_container_width=True, key=f"faculty_chart_{i+1}")
+        fig = create_pie_grid(df, question_columns, RATING_SCALE)
+        st.plotly_chart(fig, use_container_width=True, key="faculty_chart_grid")
         
         st.markdown("---")
         st.subheader("Qualitative Feedback (General Comments)")
         if COMMENT_COLUMN in df.columns:
-            comments = df[COMMENT_COLUMN].dropna()
-            non_placeholder_comments = comments[~comments.astype(str).str.strip().str.lower().isin(['n/a', 'na', 'no', ''])]
+            non_placeholder_comments = filter_comments(df[COMMENT_COLUMN])
             if not non_placeholder_comments.empty:
                 for i, comment in enumerate(non_placeholder_comments):
                     st.info(f"**Comment {i+1}:** {comment}")
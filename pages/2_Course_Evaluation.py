@@ -2,26 +2,26 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import sys
-import platform
-import asyncio
 
 # --- SECURITY GATE & FIXES: Ensures user is logged in and all modules can be imported ---
 if not st.session_state.get('authenticated', False):
     st.error("Please log in to access this page.")
     st.stop()
-if platform.system() == 'Windows':
-    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-if project_root not in sys.path:
-    sys.path.append(project_root)
+# Page scripts re-run with fresh globals, so key the path fix on sys.modules: once utils
+# has been imported in this process, the filesystem probe is skipped on every rerun.
+if 'utils' not in sys.modules:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
 
 try:
     from utils import (
-        display_metadata_form, create_pie_chart, calculate_scores,
-        generate_report_html, convert_html_to_pdf
+        Scale, display_metadata_form, create_pie_grid, calculate_scores,
+        generate_report_html, render_pdf_in_background, filter_comments
     )
 except ImportError as e:
     st.error(f"A critical error occurred trying to import from 'utils.py': {e}")
@@ -29,21 +29,12 @@ except ImportError as e:
 
 # --- Page-Specific Configurations ---
 PAGE_TITLE = "Course Evaluation"
-SCORE_MAPPING = {
-    'A: Strongly Agree': 5,
-    'B: Agree': 4,
-    'C: Neutral': 3,
-    'D: Disagree': 2,
-    'E: Strongly Disagree': 1
-}
-CATEGORY_ORDER = ["Strongly Agree", "Agree", "Neutral", "Disagree", "Strongly Disagree"]
-COLOR_MAP = {
-    "Strongly Agree": "#2ca02c",
-    "Agree": "#1f7b14",
-    "Neutral": "#ff7f0e",
-    "Disagree": "#d62728",
-    "Strongly Disagree": "#9467bd"
-}
+# Answers may carry an option prefix ("A: Excellent"); the scale matches on the label after it
+RATING_SCALE = Scale(
+    order=("Strongly Agree", "Agree", "Neutral", "Disagree", "Strongly Disagree"),
+    colors=np.array(["#2ca02c", "#1f7b14", "#ff7f0e", "#d62728", "#9467bd"]),
+    codes=np.array([5, 4, 3, 2, 1], dtype=np.int8)
+)
 COMMENT_COLUMN = 'General comment '
 QUESTION_COLUMNS_SLICE = slice(1, 5)
 CONVERTED_SCORE_MAX = 15
@@ -55,7 +46,7 @@ def display_score_analysis(df):
     st.subheader("Score Summary")
     
     scores_df, total_avg_sum, _, overall_average, max_possible_sum = calculate_scores(
-        df, QUESTION_COLUMNS_SLICE, SCORE_MAPPING, CONVERTED_SCORE_MAX
+        df, QUESTION_COLUMNS_SLICE, RATING_SCALE, CONVERTED_SCORE_MAX
     )
     
     st.write("The table below shows the average score for each attribute on a scale of 1 to 5.")
@@ -79,13 +70,13 @@ st.title(f"📚 {PAGE_TITLE} Report Builder")
 with st.sidebar:
     st.write(f"Logged in as **{st.session_state.username}**")
     if st.button("Logout", key="logout_course"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        for key in ('authenticated', 'username', 'role', 'processed_data'):
+            st.session_state.pop(key, None)
         st.rerun()
     st.markdown("---")
 
     if 'processed_data' not in st.session_state:
-        display_metadata_form(PAGE_TITLE, requires_faculty_name=False)
+        display_metadata_form(PAGE_TITLE, requires_faculty_name=False, question_columns_slice=QUESTION_COLUMNS_SLICE)
     else:
         st.header("Export Report")
         data = st.session_state.processed_data
@@ -93,11 +84,11 @@ with st.sidebar:
         
         if st.button("Generate PDF", key="generate_course_pdf"):
             with st.spinner("Generating PDF... This may take a moment."):
-                html_string = generate_report_html(
-                    data['df'], PAGE_TITLE, metadata, QUESTION_COLUMNS_SLICE, CATEGORY_ORDER,
-                    COLOR_MAP, COMMENT_COLUMN, SCORE_MAPPING, CONVERTED_SCORE_MAX
+                html_string, assets = generate_report_html(
+                    data['df'], PAGE_TITLE, metadata, QUESTION_COLUMNS_SLICE, RATING_SCALE,
+                    COMMENT_COLUMN, CONVERTED_SCORE_MAX
                 )
-                pdf_bytes = convert_html_to_pdf(html_string)
+                pdf_bytes = render_pdf_in_background(html_string, assets)
                 st.download_button(
                     "Download PDF", pdf_bytes,
                     f"{metadata['Course Code']}_{PAGE_TITLE}_Report.pdf", "application/pdf"
@@ -123,23 +114,13 @@ if 'processed_data' in st.session_state:
         st.markdown("---")
         
         st.subheader("Quantitative Feedback Analysis")
-        for i in range(0, len(question_columns), 2):
-            col1, col2 = st.columns(2)
-            with col1:
-                fig1 = create_pie_chart(df, question_columns[i], CATEGORY_ORDER, COLOR_MAP)
-                # FIX: Added a unique key based on the column name
-                st.plotly_chart(fig1, use_container_width=True, key=f"course_chart_{question_columns[i]}")
-            if (i + 1) < len(question_columns):
-                with col2:
-                    fig2 = create_pie_chart(df, question_columns[i+1], CATEGORY_ORDER, COLOR_MAP)
-                    # FIX: Added a unique key based on the column name
-                    st.plotly_chart(fig2, use_container_width=True, key=f"course_chart_{question_columns[i+1]}")
+        fig = create_pie_grid(df, question_columns, RATING_SCALE)
+        st.plotly_chart(fig, use_container_width=True, key="course_chart_grid")
         
         st.markdown("---")
         st.subheader("Qualitative Feedback (General Comments)")
         if COMMENT_COLUMN in df.columns:
-            comments = df[COMMENT_COLUMN].dropna()
-            non_placeholder_comments = comments[~comments.astype(str).str.strip().str.lower().isin(['n/a', 'na', 'no', ''])]
+            non_placeholder_comments = filter_comments(df[COMMENT_COLUMN])
             if not non_placeholder_comments.empty:
                 for i, comment in enumerate(non_placeholder_comments):
                     st.info(f"**Comment {i+1}:** {comment}")
@@ -2,7 +2,7 @@
 
 import streamlit as st
 import pandas as pd
-from db_utils import add_user, get_all_users
+from db_utils import add_user, add_users_bulk, get_all_users
 
 st.set_page_config(page_title="User Management", page_icon="👤", layout="wide")
 st.title("👤 User Management")
@@ -30,6 +30,45 @@ with st.form("create_user_form", clear_on_submit=True):
             else:
                 st.error(f"Username '{new_username}' already exists.")
 
+# --- Bulk Create Users Form ---
+st.markdown("---")
+st.subheader("Bulk Create Users")
+with st.form("bulk_create_users_form", clear_on_submit=True):
+    st.write("Upload a CSV with `username` and `password` columns, and optionally a `role` column (`user` or `admin`).")
+    users_file = st.file_uploader("Users CSV", type="csv")
+    bulk_submitted = st.form_submit_button("Create Users")
+
+    if bulk_submitted:
+        if users_file is None:
+            st.warning("Please upload a CSV file.")
+        else:
+            try:
+                # No NA parsing: 'NA', 'null' or 'None' are valid usernames and passwords, not missing values
+                users_csv = pd.read_csv(users_file, dtype=str, keep_default_na=False, na_filter=False)
+            except ValueError:
+                # ParserError, EmptyDataError and UnicodeDecodeError are all ValueErrors
+                st.error("Could not read the uploaded file. Please check that it is a valid CSV."); st.stop()
+            if not {"username", "password"}.issubset(users_csv.columns):
+                st.error("The CSV must contain 'username' and 'password' columns.")
+            else:
+                if "role" not in users_csv.columns:
+                    users_csv["role"] = "user"
+                users_csv = users_csv[["username", "password", "role"]].apply(lambda col: col.str.strip())
+                users_csv["role"] = users_csv["role"].replace("", "user")
+                blank = (users_csv["username"] == "") | (users_csv["password"] == "")
+                users_csv = users_csv[~blank]
+                invalid_roles = users_csv.loc[~users_csv["role"].isin(["user", "admin"]), "role"].unique()
+                if len(invalid_roles):
+                    st.error(f"Unknown roles found: {list(invalid_roles)}")
+                else:
+                    created = add_users_bulk(users_csv.itertuples(index=False, name=None))
+                    skipped = len(users_csv) - created
+                    st.success(f"Created {created} user(s).")
+                    if skipped:
+                        st.info(f"Skipped {skipped} row(s) whose username already exists.")
+                    if blank.any():
+                        st.warning(f"Skipped {int(blank.sum())} row(s) with a blank username or password.")
+
 # --- Display Existing Users ---
 st.markdown("---")
 st.subheader("Existing Users")
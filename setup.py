@@ -4,16 +4,38 @@ import streamlit as st
 import subprocess
 import sys
 import os
+import time
+from playwright.sync_api import sync_playwright
 
 # Path where playwright browsers will be stored in Streamlit Cloud
 PLAYWRIGHT_BROWSERS_PATH = "/home/appuser/.cache/ms-playwright"
 
+def _chromium_executable_exists():
+    """
+    Asks Playwright where its Chromium build lives (this honours PLAYWRIGHT_BROWSERS_PATH and the
+    per-OS cache location) and checks that the executable is actually there.
+    """
+    try:
+        with sync_playwright() as p:
+            return os.path.exists(p.chromium.executable_path)
+    except Exception:
+        return False
+
+@st.cache_resource(show_spinner=False)
+def _browser_status():
+    """
+    Process-wide install status, probed once so later reruns and sessions skip the check.
+    Mutable so a successful install can mark it done without probing again.
+    """
+    return {'installed': _chromium_executable_exists()}
+
 def check_and_install_playwright():
     """
     Checks if the Playwright browser is installed. If not, it installs it.
     This version does NOT ask Playwright to manage system dependencies.
     """
-    if 'playwright_installed' not in st.session_state:
+    status = _browser_status()
+    if not status['installed']:
         st.info("📦 First-time setup: Installing browser binaries for PDF export...")
         st.warning("This may take a minute. The app will automatically rerun when complete.")
         
@@ -24,13 +46,26 @@ def check_and_install_playwright():
             # --- THE FIX: Removed the "--with-deps" flag ---
             # We trust packages.txt to handle the system dependencies.
             # This command will ONLY download the browser binaries.
-            subprocess.run(
+            # Popen + a polling loop (instead of a blocking run) so progress can be shown while it works.
+            # communicate() with a short timeout keeps draining the pipes, so a chatty install can't deadlock.
+            proc = subprocess.Popen(
                 [sys.executable, "-m", "playwright", "install"],
-                check=True,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True
             )
-            st.session_state.playwright_installed = True
+            progress = st.empty()
+            started = time.monotonic()
+            while True:
+                try:
+                    stdout, stderr = proc.communicate(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    progress.text(f"⏳ Installing... {time.monotonic() - started:.0f}s elapsed")
+            progress.empty()
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, proc.args, output=stdout, stderr=stderr)
+            status['installed'] = True
             st.success("✅ Browser binaries installed successfully!")
             st.rerun()
 
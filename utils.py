@@ -2,34 +2,177 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-import base64
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import tempfile
+from pathlib import Path
+import io
 from playwright.sync_api import sync_playwright
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import threading
 import re
-from urllib.error import URLError
+import math
+import textwrap
+from html import escape
+from dataclasses import dataclass
+from collections import OrderedDict
+import requests
+import platform
+import asyncio
+
+# Playwright needs the Proactor loop on Windows. Set at import so it runs once per process,
+# not on every page rerun.
+if platform.system() == 'Windows':
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+# A single worker thread for Playwright, so the PDF render runs off the Streamlit script thread.
+# One thread because sync Playwright objects (the pooled browser below) are bound to the thread that created them.
+PDF_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-export")
+
+# PDF chart size: 7x5 in at 200 dpi, i.e. 1400x1000 px
+CHART_FIGSIZE = (7, 5)
+CHART_DPI = 200
+
+# Pooled Chromium: launched once and reused across PDFs, recycled after BROWSER_MAX_USES to cap leaks.
+# PDFs share one BrowserContext (a page each), reset every CONTEXT_MAX_USES to drop accumulated state.
+# No exit hook: these objects belong to the pdf-export thread, and the Playwright driver takes Chromium
+# down with it when the process ends.
+BROWSER_MAX_USES = 200
+CONTEXT_MAX_USES = 50
+# A4 at 150 dpi
+PDF_VIEWPORT = {"width": 1240, "height": 1754}
+# Playwright's per-action timeout inside a render, and how long a session waits for its PDF (which
+# includes time queued behind other sessions on the single pdf-export worker)
+PDF_PAGE_TIMEOUT_MS = 30_000
+PDF_RENDER_TIMEOUT_S = 90
+_browser_lock = threading.Lock()
+_playwright = None
+_browser = None
+_browser_uses = 0
+# Set after a failed or timed-out render so the next conversion starts on a fresh browser
+_browser_stale = False
+_context = None
+_context_uses = 0
+
+# Conditional-GET state for sheet exports, keyed by export URL (sheet id + gid): (ETag, Last-Modified,
+# parsed frame) from the last full response, so a 304 skips the body and the parse
+_http = requests.Session()
+# Least-recently-used first; capped so a long-running process doesn't keep every sheet it has ever loaded
+CSV_CACHE_MAX_ENTRIES = 16
+_csv_cache_lock = threading.Lock()
+_csv_cache = OrderedDict()
+
+# Sheet id and tab (gid) in a Google Sheets URL, compiled once rather than looked up on every load
+SHEET_ID_RE = re.compile(r"/d/([a-zA-Z0-9-_]+)")
+GID_RE = re.compile(r"gid=([0-9]+)")
+
+# Matches placeholder answers ("N/A", "na", "no", blank) so they can be dropped in a single pass
+PLACEHOLDER_COMMENT_RE = re.compile(r"^\s*(?:n/?a|no)?\s*$", re.IGNORECASE)
+
+
+# -------------------------------
+# Rating Scale
+# -------------------------------
+@dataclass(frozen=True, slots=True)
+class Scale:
+    """
+    A Likert rating scale. `order` holds the answer labels in display order, `colors` the chart
+    color and `codes` the numerical score of each label, all aligned by position so that
+    lookups are array indexing rather than dict probes.
+    """
+    order: tuple
+    colors: np.ndarray
+    codes: np.ndarray
+
+    def positions(self, answers):
+        """Returns each answer's index in `order` (-1 if unknown), ignoring 'A: '-style option prefixes."""
+        labels = pd.Index(answers).astype(str).str.split(': ', n=1).str[-1]
+        return pd.Index(self.order).get_indexer(labels)
 
 
 # -------------------------------
 # Data Loading
 # -------------------------------
+def _parse_csv(data):
+    """
+    Parses CSV bytes with the multithreaded pyarrow engine, keeping the C engine's behaviour where
+    the two differ: repeated headers get its '.1'-style suffixes, and ragged files (short rows) are
+    re-read with it so the missing cells become NaN instead of failing the load.
+    """
+    try:
+        df = pd.read_csv(io.BytesIO(data), engine='pyarrow')
+    except pd.errors.ParserError:
+        return pd.read_csv(io.BytesIO(data))
+    if df.columns.has_duplicates:
+        # A header-only C-engine read yields exactly the de-duplicated names pandas would have used
+        df.columns = pd.read_csv(io.BytesIO(data), nrows=0).columns
+    return df
+
+
+def _download_csv(export_url):
+    """
+    Fetches a CSV export with a conditional GET over the shared session. When the server answers
+    304 Not Modified, the frame parsed from the previous download is reused.
+    """
+    headers = {}
+    with _csv_cache_lock:
+        cached = _csv_cache.get(export_url)
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    resp = _http.get(export_url, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        df = cached[2]
+    else:
+        resp.raise_for_status()
+        df = _parse_csv(resp.content)
+        cached = (resp.headers.get('ETag'), resp.headers.get('Last-Modified'), df)
+    with _csv_cache_lock:
+        _csv_cache[export_url] = cached
+        _csv_cache.move_to_end(export_url)
+        while len(_csv_cache) > CSV_CACHE_MAX_ENTRIES:
+            _csv_cache.popitem(last=False)
+    return df
+
+
+@st.cache_data(ttl=600, max_entries=16, show_spinner=False)
+def _fetch_gsheet_csv(export_url):
+    """
+    Downloads and parses a sheet's CSV export. Cached for 10 minutes; after that the sheet is
+    revalidated with a conditional GET. Failures raise and are not cached.
+    """
+    return _download_csv(export_url)
+
+
+@st.cache_data(ttl=3600, max_entries=16, show_spinner=False)
+def _read_uploaded_csv(name, data):
+    """Parses an uploaded CSV, keyed on the file's name and bytes so reruns reuse the parsed frame (kept for an hour, 16 files at most)."""
+    return _parse_csv(data)
+
+
 def load_df_from_gsheet_url(url):
     """
     Takes a Google Sheet URL, converts it to a CSV export URL, and loads it into a DataFrame.
     Includes improved, specific error handling for cloud environments.
     """
     try:
-        match_id = re.search(r"/d/([a-zA-Z0-9-_]+)", url)
-        match_gid = re.search(r"gid=([0-9]+)", url)
+        match_id = SHEET_ID_RE.search(url)
+        match_gid = GID_RE.search(url)
         if not match_id:
             st.error("Invalid Google Sheet URL. Could not find the sheet ID.")
             return None
         sheet_id = match_id.group(1)
         gid = match_gid.group(1) if match_gid else "0"
         export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-        df = pd.read_csv(export_url)
+        df = _fetch_gsheet_csv(export_url)
         return df
-    except URLError:
+    except requests.ConnectionError:
         st.error("Network Connection Error: Failed to connect.")
         st.warning("This may be due to a firewall. Try the 'Upload CSV' option.")
         return None
@@ -39,12 +182,70 @@ def load_df_from_gsheet_url(url):
         return None
 
 
+def categorize_question_columns(df, question_columns_slice):
+    """
+    Stores the Likert question columns as pandas categoricals: one small int code per cell
+    plus a shared dictionary of the few distinct answers, instead of one Python string per cell.
+    """
+    return df.astype({col: 'category' for col in df.columns[question_columns_slice]})
+
+
+# -------------------------------
+# Comment Filtering
+# -------------------------------
+def filter_comments(comments):
+    """Drops missing and placeholder comments using one regex pass over the column."""
+    comments = comments.dropna()
+    return comments[~comments.astype(str).str.match(PLACEHOLDER_COMMENT_RE)]
+
+
+# -------------------------------
+# Rating Extraction
+# -------------------------------
+def _has_option_prefix(series):
+    """True if any answer in a text column carries an 'A: '-style prefix (one vectorized scan, NaN-safe)."""
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return False
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Only the distinct answers need checking
+        return bool(series.cat.categories.astype(str).str.contains(': ', regex=False).any())
+    return bool(series.str.contains(': ', regex=False, na=False).any())
+
+
+def _strip_option_prefix(series):
+    """Turns answers like 'A: Excellent' into 'Excellent'. Categoricals are split per category, not per row."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Several old categories can collapse onto one label ('A: Good', 'Good'), so map old codes to
+        # the deduplicated labels' codes; a trailing -1 slot keeps code -1 (missing answer) missing
+        new_codes, labels = pd.factorize(series.cat.categories.astype(str).str.split(': ', n=1).str[-1])
+        code_lut = np.append(new_codes, -1)
+        return pd.Series(
+            pd.Categorical.from_codes(code_lut[series.cat.codes.to_numpy()], categories=labels),
+            index=series.index, name=series.name
+        )
+    return series.str.split(': ', n=1).str[-1]
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _extract_ratings_frame(df, question_columns):
+    """
+    Returns the question columns with option prefixes stripped. Computed once per DataFrame and
+    shared by the charts, the score summary and the PDF instead of each re-splitting the answers.
+    """
+    needs_split = {col_name: _has_option_prefix(df[col_name]) for col_name in question_columns}
+    return pd.DataFrame(
+        {col_name: _strip_option_prefix(df[col_name]) if needs_split[col_name] else df[col_name] for col_name in question_columns},
+        index=df.index
+    )
+
+
 # -------------------------------
 # Sidebar Form
 # -------------------------------
-def display_metadata_form(page_type, requires_faculty_name=True):
+def display_metadata_form(page_type, requires_faculty_name=True, question_columns_slice=None):
     """
     Creates a reusable form in the sidebar with specific and helpful validation.
+    When `question_columns_slice` is given, those columns are loaded as categoricals.
     """
     with st.form("metadata_form"):
         st.info("Fill in the details below and provide your data source.")
@@ -81,13 +282,19 @@ def display_metadata_form(page_type, requires_faculty_name=True):
             if source_option == "Upload CSV File":
                 if uploaded_file is None:
                     st.warning("Please upload a CSV file."); st.stop()
-                df = pd.read_csv(uploaded_file)
+                try:
+                    df = _read_uploaded_csv(uploaded_file.name, uploaded_file.getvalue())
+                except ValueError:
+                    # ParserError, EmptyDataError and UnicodeDecodeError are all ValueErrors
+                    st.error("Could not read the uploaded file. Please check that it is a valid CSV export."); st.stop()
             else:
                 if not gsheet_url:
                     st.warning("Please paste a Google Sheet link."); st.stop()
                 df = load_df_from_gsheet_url(gsheet_url)
                 if df is None:
                     st.stop()
+            if question_columns_slice is not None:
+                df = categorize_question_columns(df, question_columns_slice)
             
             with st.spinner("Processing data..."):
                 metadata = {
@@ -104,19 +311,27 @@ def display_metadata_form(page_type, requires_faculty_name=True):
 # -------------------------------
 # Chart Generation
 # -------------------------------
-def _generate_figure(ratings_series, category_order, color_map):
+def _count_ratings(ratings_series, rating_scale):
     """
-    Single source of truth for creating a chart figure.
-    Both the UI and the PDF will call this function.
+    Counts the answers per rating in scale order, including ratings with 0 responses. The answers are
+    coded against the scale as a fixed-category Categorical, so counting is a bincount over small int
+    codes; unknown labels get code -1 and are left out, as the old reindex did.
     """
-    rating_counts = ratings_series.value_counts().reindex(category_order, fill_value=0).reset_index()
-    rating_counts.columns = ['Rating', 'Count']
-    
-    fig = px.pie(
-        rating_counts, names='Rating', values='Count', hole=0.4,
-        color='Rating',
-        color_discrete_map=color_map.copy()
-    )
+    codes = pd.Categorical(ratings_series, categories=rating_scale.order).codes
+    counts = np.bincount(codes[codes >= 0], minlength=len(rating_scale.order))
+    return pd.DataFrame({'Rating': rating_scale.order, 'Count': counts})
+
+
+def _generate_figure(ratings_series, rating_scale):
+    """
+    Single source of truth for creating the interactive chart figure; the UI grid reuses its pie traces.
+    """
+    rating_counts = _count_ratings(ratings_series, rating_scale)
+
+    fig = go.Figure(go.Pie(
+        labels=rating_counts['Rating'], values=rating_counts['Count'], hole=0.4,
+        marker_colors=rating_scale.colors, sort=False
+    ))
     fig.update_traces(textposition='inside', textinfo='percent+label', pull=[0.05, 0, 0, 0, 0])
     fig.update_layout(
         showlegend=False, uniformtext_minsize=12, uniformtext_mode='hide',
@@ -125,45 +340,88 @@ def _generate_figure(ratings_series, category_order, color_map):
     return fig, rating_counts
 
 
-def create_pie_chart(df, col_name, category_order, color_map):
+@st.cache_data(show_spinner=False, max_entries=16)
+def _build_pie_grid(df, question_columns, rating_scale):
     """
-    Creates a Pie Chart and supplements it with a data table for the UI.
+    Memoized two-column grid holding one pie per question, plus a per-question counts table.
+    Each pie trace comes from _generate_figure; the counts use the same _count_ratings as the PDF.
     """
-    st.markdown(f"#### {col_name}")
-    
-    if df[col_name].dtype == 'object' and ': ' in str(df[col_name].iloc[0]):
-        ratings_for_viz = df[col_name].str.split(': ').str[1].dropna()
-    else:
-        ratings_for_viz = df[col_name].dropna()
-    
-    fig, rating_counts = _generate_figure(ratings_for_viz, category_order, color_map)
-    
+    rows = max(1, math.ceil(len(question_columns) / 2))
+    titles = ["<br>".join(textwrap.wrap(f"Q{idx}. {col_name}", 60)) for idx, col_name in enumerate(question_columns, 1)]
+    grid = make_subplots(
+        rows=rows, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]] * rows,
+        subplot_titles=titles, vertical_spacing=0.12 / rows
+    )
+
+    ratings = _extract_ratings_frame(df, question_columns)
+    counts = {}
+    for idx, col_name in enumerate(question_columns):
+        fig, rating_counts = _generate_figure(ratings[col_name].dropna(), rating_scale)
+        for trace in fig.data:
+            grid.add_trace(trace, row=idx // 2 + 1, col=idx % 2 + 1)
+        counts[col_name] = rating_counts.set_index('Rating')['Count']
+
+    grid.update_layout(
+        showlegend=False, uniformtext_minsize=12, uniformtext_mode='hide',
+        height=450 * rows, margin={'t': 80}
+    )
+    counts_df = pd.DataFrame(counts).T.reindex(columns=rating_scale.order)
+    counts_df.index.name = 'Question'
+    return grid, counts_df
+
+
+def create_pie_grid(df, question_columns, rating_scale):
+    """
+    Creates one Plotly figure with a pie per question (sent to the browser as a single chart)
+    and supplements it with a table of raw counts for the UI.
+    """
+    fig, counts_df = _build_pie_grid(df, tuple(question_columns), rating_scale)
+
     with st.expander("View Raw Counts (includes categories with 0 responses)"):
-        st.dataframe(rating_counts, hide_index=True, use_container_width=True)
-    
+        st.dataframe(counts_df, use_container_width=True)
+
     return fig
 
 
 # -------------------------------
 # Score Calculation
 # -------------------------------
-def calculate_scores(df, question_columns_slice, score_mapping, new_max_score=60):
-    """Performs score calculations by mapping the raw string values directly."""
+def _average_scores(question_frame, rating_scale):
+    """
+    Scores each question column from its integer answer codes (the categorical codes, or a
+    factorization for non-categorical columns): each distinct answer is scored once and the scores
+    are gathered by code. Returns the per-column averages and a {column: [unknown ratings]} dict.
+    """
+    # Trailing NaN slot so answers not on the scale score as missing
+    label_scores = np.append(rating_scale.codes.astype(float), np.nan)
+    averages, unknown = [], {}
+    for col_name in question_frame.columns:
+        series = question_frame[col_name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, labels = pd.factorize(series)
+        positions = rating_scale.positions(labels)
+        # Another trailing NaN so code -1 (missing answer) stays missing
+        scores = np.append(label_scores[positions], np.nan)[codes]
+        averages.append(np.nanmean(scores) if not np.isnan(scores).all() else np.nan)
+        unknown_labels = labels[(positions == -1) & np.isin(np.arange(len(labels)), codes)]
+        if len(unknown_labels):
+            unknown[col_name] = list(unknown_labels)
+    return np.array(averages), unknown
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def calculate_scores(df, question_columns_slice, rating_scale, new_max_score=60):
+    """Performs score calculations by looking up each answer's score on the rating scale."""
     question_columns = df.columns[question_columns_slice]
-    score_results = []
-    
-    for col in question_columns:
-        ratings = df[col].dropna()
-        numerical_scores = ratings.map(score_mapping)
-        unmapped_values = ratings[numerical_scores.isna()]
-        if not unmapped_values.empty:
-            st.warning(f"In question **'{col}'**, the following unknown ratings were found and ignored: `{list(unmapped_values.unique())}`")
-        average_score = numerical_scores.mean()
-        score_results.append({"Attribute": col, "Average Score": average_score})
-
-    scores_df = pd.DataFrame(score_results)
+    averages, unknown = _average_scores(_extract_ratings_frame(df, tuple(question_columns)), rating_scale)
+    for col, unmapped_values in unknown.items():
+        st.warning(f"In question **'{col}'**, the following unknown ratings were found and ignored: `{unmapped_values}`")
+
+    scores_df = pd.DataFrame({"Attribute": question_columns, "Average Score": averages})
     total_avg_sum = scores_df['Average Score'].sum()
-    max_rating_value = 5
+    max_rating_value = int(rating_scale.codes.max())
     max_possible_sum = len(question_columns) * max_rating_value
     converted_score = (total_avg_sum / max_possible_sum) * new_max_score if max_possible_sum > 0 else 0
     overall_average = scores_df['Average Score'].mean()
@@ -174,26 +432,54 @@ def calculate_scores(df, question_columns_slice, score_mapping, new_max_score=60
 # -------------------------------
 # Report Generation (PDF Ready)
 # -------------------------------
-def fig_to_base64_img(fig, width=700, height=500, scale=2):
-    """Convert a Plotly figure to a base64 PNG string for embedding in HTML."""
-    img_bytes = pio.to_image(fig, format="png", width=width, height=height, scale=scale)
-    base64_str = base64.b64encode(img_bytes).decode("utf-8")
-    return f"<img src='data:image/png;base64,{base64_str}' style='max-width:100%; height:auto; border-radius:8px; box-shadow:0 2px 6px rgba(0,0,0,0.1);'/>"
+def _render_pie_png(rating_counts, rating_scale):
+    """
+    Draws the PDF version of a question's donut chart with Matplotlib's Agg backend and returns PNG bytes.
+    Mirrors the Plotly figure (hole, first-slice pull, percent+label inside each slice) without a browser.
+    """
+    fig = Figure(figsize=CHART_FIGSIZE, dpi=CHART_DPI)
+    ax = fig.subplots()
+    ax.set_title('Response Distribution')
+    counts = rating_counts['Count'].to_numpy()
+    total = counts.sum()
+    if total:
+        texts = [f"{label}\n{count / total:.1%}" if count else "" for label, count in zip(rating_counts['Rating'], counts)]
+        ax.pie(
+            counts, labels=texts, colors=rating_scale.colors, explode=[0.05] + [0] * (len(counts) - 1),
+            startangle=90, counterclock=False, labeldistance=0.7, wedgeprops={'width': 0.6},
+            textprops={'color': 'white', 'fontsize': 10, 'ha': 'center', 'va': 'center'}
+        )
+    ax.set_aspect('equal')
+    ax.axis('off')
+    buf = io.BytesIO()
+    FigureCanvasAgg(fig).print_png(buf)
+    return buf.getvalue()
+
 
+def chart_img_tag(src):
+    """Builds the styled <img> tag for a chart image file referenced relative to the report."""
+    return f"<img src='{src}' style='max-width:100%; height:auto; border-radius:8px; box-shadow:0 2px 6px rgba(0,0,0,0.1);'/>"
 
-def generate_report_html(df, report_title, metadata, question_columns_slice, category_order, color_map, comment_column, score_mapping, new_max_score=60):
-    """Generates a self-contained HTML string for the PDF report (charts embedded as base64 images)."""
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def generate_report_html(df, report_title, metadata, question_columns_slice, rating_scale, comment_column, new_max_score=60):
+    """
+    Generates the HTML for the PDF report. Returns (html, assets), where assets maps each chart's
+    relative file name to its PNG bytes; convert_html_to_pdf writes them next to the HTML.
+    Memoized on the data and metadata, so regenerating an unchanged report returns the cached build.
+    """
     question_columns = df.columns[question_columns_slice]
 
     # Metadata section
-    metadata_html = "<table class='meta-table'>"
     display_order = ['Faculty Name', 'Program', 'Course Code', 'Batch', 'Semester']
     sorted_metadata = {k: metadata[k] for k in display_order if k in metadata}
-    for key, value in sorted_metadata.items():
-        metadata_html += f"<tr><td class='meta-key'>{key}:</td><td>{value}</td></tr>"
-    metadata_html += "</table>"
+    metadata_html = "<table class='meta-table'>" + "".join(
+        f"<tr><td class='meta-key'>{key}:</td><td>{escape(str(value))}</td></tr>" for key, value in sorted_metadata.items()
+    ) + "</table>"
 
-    html = f"""
+    # Collected as parts and joined once at the end; repeated `+=` re-copies the growing string
+    parts = []
+    parts.append(f"""
     <html><head><style>
         body {{ font-family: Arial, sans-serif; background-color:#fafafa; color:#333; }}
         h1, h2, h3, h4 {{ color: #222; }}
@@ -220,103 +506,194 @@ def generate_report_html(df, report_title, metadata, question_columns_slice, cat
         <div class="header"><h1>{report_title}</h1>{metadata_html}</div>
         <p><b>Total Responses:</b> {len(df)}</p>
         <div class="section-title">Quantitative Feedback</div>
-    """
+    """)
 
     # Charts + tables
+    ratings = _extract_ratings_frame(df, tuple(question_columns))
+    assets = {}
     for idx, col_name in enumerate(question_columns, 1):
-        if df[col_name].dtype == 'object' and ': ' in str(df[col_name].iloc[0]):
-            ratings_for_viz = df[col_name].str.split(': ').str[1].dropna()
-        else:
-            ratings_for_viz = df[col_name].dropna()
-
-        fig, rating_counts = _generate_figure(ratings_for_viz, category_order, color_map)
-        chart_img = fig_to_base64_img(fig)
+        rating_counts = _count_ratings(ratings[col_name].dropna(), rating_scale)
+        assets[f"chart_{idx}.png"] = _render_pie_png(rating_counts, rating_scale)
+        chart_img = chart_img_tag(f"chart_{idx}.png")
 
-        table_html = "<table><thead><tr><th>Rating</th><th>Count</th></tr></thead><tbody>"
-        for _, row in rating_counts.iterrows():
-            table_html += f"<tr><td>{row['Rating']}</td><td>{row['Count']}</td></tr>"
-        table_html += "</tbody></table>"
+        table_html = "<table><thead><tr><th>Rating</th><th>Count</th></tr></thead><tbody>" + "".join(
+            f"<tr><td>{rating}</td><td>{count}</td></tr>" for rating, count in zip(rating_counts['Rating'], rating_counts['Count'])
+        ) + "</tbody></table>"
 
-        html += f"""
+        parts.append(f"""
         <div class="question-card">
-            <div class="question-header">Q{idx}. {col_name}</div>
+            <div class="question-header">Q{idx}. {escape(col_name)}</div>
             <div class="chart-table-container">
                 <div style="width:60%;">{chart_img}</div>
                 <div>{table_html}</div>
             </div>
         </div>
-        """
+        """)
 
     # Comments
-    html += "<div class='section-title'>Qualitative Feedback</div>"
+    parts.append("<div class='section-title'>Qualitative Feedback</div>")
     if comment_column in df.columns:
-        comments = df[comment_column].dropna()
-        non_placeholder_comments = comments[~comments.astype(str).str.strip().str.lower().isin(['n/a', 'na', 'no', ''])]
+        non_placeholder_comments = filter_comments(df[comment_column])
         if not non_placeholder_comments.empty:
-            for comment in non_placeholder_comments:
-                html += f'<div class="comment">{comment}</div>'
+            # Free-text answers are escaped so stray markup can't break (or inject into) the report
+            safe_comments = non_placeholder_comments.astype(str).map(escape)
+            parts.append("".join(f'<div class="comment">{comment}</div>' for comment in safe_comments))
     else:
-        html += "<p>No qualitative feedback available.</p>"
+        parts.append("<p>No qualitative feedback available.</p>")
 
     # Score summary
     scores_df, total_avg_sum, converted_score, overall_average, max_possible_sum = calculate_scores(
-        df, question_columns_slice, score_mapping, new_max_score
+        df, question_columns_slice, rating_scale, new_max_score
+    )
+    parts.append('<div class="section-title">Score Summary</div><div class="score-section"><table><thead><tr><th>Attribute</th><th>Average Score</th></tr></thead><tbody>')
+    parts.extend(
+        f"<tr><td>{escape(attribute)}</td><td>{average:.2f}</td></tr>" for attribute, average in zip(scores_df['Attribute'], scores_df['Average Score'])
     )
-    html += '<div class="section-title">Score Summary</div><div class="score-section"><table><thead><tr><th>Attribute</th><th>Average Score</th></tr></thead><tbody>'
-    for _, row in scores_df.iterrows():
-        html += f"<tr><td>{row['Attribute']}</td><td>{row['Average Score']:.2f}</td></tr>"
-    html += '</tbody></table>'
+    parts.append('</tbody></table>')
 
-    html += f"""
+    parts.append(f"""
     <div class="metrics-container">
         <div class="metric-card"><h4>Total Score (out of {max_possible_sum})</h4><p>{total_avg_sum:.2f}</p></div>
         <div class="metric-card"><h4>Converted Score (out of {new_max_score})</h4><p>{converted_score:.2f}</p></div>
         <div class="metric-card"><h4>Overall Average Rating (out of 5)</h4><p>{overall_average:.2f}</p></div>
     </div></div>
-    """
+    """)
 
-    html += "</div></body></html>"
-    return html
+    parts.append("</div></body></html>")
+    return "".join(parts), assets
 
 
 # -------------------------------
 # PDF Export (FIXED)
 # -------------------------------
-def convert_html_to_pdf(html_string):
-    """Uses Playwright to convert an HTML string to a PDF, ensuring images load first."""
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html_string, wait_until="load")
-
-        # Ensure all images are fully loaded before exporting
-        page.evaluate("""
-            () => new Promise((resolve) => {
-                const imgs = Array.from(document.images);
-                if (imgs.length === 0) { resolve(); return; }
-                let loaded = 0;
-                imgs.forEach(img => {
-                    if (img.complete) {
-                        loaded++;
-                        if (loaded === imgs.length) resolve();
-                    } else {
-                        img.addEventListener('load', () => {
-                            loaded++;
-                            if (loaded === imgs.length) resolve();
-                        });
-                        img.addEventListener('error', () => {
-                            loaded++;
-                            if (loaded === imgs.length) resolve();
-                        });
-                    }
-                });
-            })
-        """)
+def _get_browser():
+    """
+    Returns the shared Chromium instance, launching it on first use and recycling it after
+    BROWSER_MAX_USES conversions (or if it has crashed or was marked stale). Caller must hold _browser_lock.
+    """
+    global _playwright, _browser, _browser_uses, _browser_stale
+    if _browser is not None and (_browser_stale or _browser_uses >= BROWSER_MAX_USES or not _browser.is_connected()):
+        _browser_stale = False
+        try:
+            _close_browser()
+        except Exception:
+            pass  # a wedged browser may not close cleanly; _close_browser has already dropped it
+    if _browser is None:
+        if _playwright is None:
+            _playwright = sync_playwright().start()
+        _browser = _playwright.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
+        _browser_uses = 0
+    _browser_uses += 1
+    return _browser
+
+
+def _get_context():
+    """
+    Returns the shared BrowserContext, creating it on the current browser on first use, after the
+    browser was recycled, or after CONTEXT_MAX_USES conversions. Caller must hold _browser_lock.
+    """
+    global _context, _context_uses
+    browser = _get_browser()  # recycling the browser also drops _context
+    if _context is not None and _context_uses >= CONTEXT_MAX_USES:
+        try:
+            _context.close()
+        finally:
+            _context = None
+    if _context is None:
+        _context = browser.new_context(viewport=PDF_VIEWPORT)
+        _context_uses = 0
+    _context_uses += 1
+    return _context
+
+
+def _close_browser():
+    """Closes the shared browser (and with it the shared context) and stops Playwright. Caller must hold _browser_lock."""
+    global _playwright, _browser, _context
+    _context = None
+    try:
+        if _browser is not None:
+            _browser.close()
+        if _playwright is not None:
+            _playwright.stop()
+    finally:
+        _playwright = _browser = None
+
 
-        pdf_bytes = page.pdf(
+def convert_html_to_pdf(html_string, assets):
+    """
+    Uses Playwright to convert an HTML string to a PDF, ensuring images load first.
+    The HTML and its chart images are written to a temp directory and loaded from file:// URLs,
+    so the browser decodes the PNGs natively instead of parsing them out of base64, and the PDF
+    is written straight to disk. Reuses the pooled browser and context with a fresh page per call;
+    run it on PDF_EXECUTOR.
+    """
+    with tempfile.TemporaryDirectory(prefix="report-") as tmp:
+        tmpdir = Path(tmp)
+        for name, data in assets.items():
+            (tmpdir / name).write_bytes(data)
+        report_path = tmpdir / "report.html"
+        report_path.write_text(html_string, encoding="utf-8")
+        pdf_path = tmpdir / "report.pdf"
+
+        with _browser_lock:
+            _print_to_pdf(report_path.as_uri(), pdf_path)
+        return pdf_path.read_bytes()
+
+
+def _print_to_pdf(url, pdf_path):
+    """
+    Loads url in a new page of the shared context and prints it to pdf_path. Any failure marks the
+    browser stale so the next conversion relaunches it. Caller must hold _browser_lock.
+    """
+    global _browser_stale
+    try:
+        page = _get_context().new_page()
+    except Exception:
+        _browser_stale = True
+        raise
+    page.set_default_timeout(PDF_PAGE_TIMEOUT_MS)
+    try:
+        # The load event only fires once every <img> in the document has loaded (or failed), and the
+        # charts are local files, so nothing is left to wait for before printing
+        page.goto(url, wait_until="load")
+        page.pdf(
+            path=str(pdf_path),
             format="A4",
             print_background=True,
             margin={"top": "40px", "bottom": "40px", "left": "30px", "right": "30px"}
         )
-        browser.close()
-    return pdf_bytes
+    except Exception:
+        _browser_stale = True
+        raise
+    finally:
+        try:
+            page.close()
+        except Exception:
+            _browser_stale = True
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _render_pdf(html_string, assets):
+    """
+    Runs convert_html_to_pdf on the PDF worker pool and waits for the bytes. Memoized on the HTML
+    and chart images, so clicking "Generate PDF" again for the same report skips Chromium entirely.
+    Raises TimeoutError after PDF_RENDER_TIMEOUT_S (which is not cached).
+    """
+    global _browser_stale
+    future = PDF_EXECUTOR.submit(convert_html_to_pdf, html_string, assets)
+    try:
+        return future.result(timeout=PDF_RENDER_TIMEOUT_S)
+    except FuturesTimeoutError:
+        # Drop the job if it is still queued, and have the worker relaunch Chromium once it's free
+        future.cancel()
+        _browser_stale = True
+        raise
+
+
+def render_pdf_in_background(html_string, assets):
+    """Returns the report's PDF bytes; a wedged render shows an error and stops the run instead of hanging the session."""
+    try:
+        return _render_pdf(html_string, assets)
+    except FuturesTimeoutError:
+        st.error("PDF rendering timed out. Please try again in a moment.")
+        st.stop()